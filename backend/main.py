@@ -1,27 +1,76 @@
 import os
+from contextlib import asynccontextmanager
+from dataclasses import asdict
+from functools import lru_cache
 from pathlib import Path
-from typing import Dict, List
+from typing import Any, Dict, List, Optional, Tuple
 
+import jinja2
 from fastapi import Depends, FastAPI, Form, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
-from fastapi.responses import RedirectResponse
+from fastapi.responses import HTMLResponse, ORJSONResponse, RedirectResponse
 from fastapi.templating import Jinja2Templates
+from starlette.datastructures import FormData
 from starlette.middleware.base import BaseHTTPMiddleware
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, joinedload, selectinload
 
 from .database import Base, engine, get_db
-from .models import Centre, Competencies, Diagnostics, Infrastructure, Medication
+from .migrations import upgrade_schema
+from .models import (
+    COMPETENCIES_FLAGS,
+    DIAGNOSTICS_FLAGS,
+    INFRASTRUCTURE_FLAGS,
+    Centre,
+    Competencies,
+    Diagnostics,
+    Infrastructure,
+    Medication,
+)
 from .reasoning_engine import generate_clinical_analysis
+from .schemas import PatientRecord
 from .triage_engine import run_resource_aware_triage
 
 Base.metadata.create_all(bind=engine)
+upgrade_schema(engine)
 
-app = FastAPI(title="Med-Dev-Vi")
 templates = Jinja2Templates(directory=str(Path(__file__).resolve().parent.parent / "frontend"))
+templates.env.auto_reload = False
+templates.env.bytecode_cache = jinja2.FileSystemBytecodeCache()
+
+PAGE_TEMPLATES = (
+    "pages/index.html",
+    "pages/student.html",
+    "pages/clinician.html",
+    "pages/peripheral.html",
+    "pages/peripheral_setup.html",
+)
+STATIC_PAGES = ("pages/index.html", "pages/student.html", "pages/clinician.html")
+
+
+@asynccontextmanager
+async def lifespan(_: FastAPI):
+    for name in PAGE_TEMPLATES:
+        templates.get_template(name)
+    for name in STATIC_PAGES:
+        _page_shell(name)
+    yield
+
+
+app = FastAPI(title="Med-Dev-Vi", default_response_class=ORJSONResponse, lifespan=lifespan)
+
+# Values pydantic accepts as True for a bool form field; a checked checkbox
+# posts "on".
+_FORM_TRUE = frozenset({"1", "on", "t", "true", "y", "yes"})
 
 DISCLAIMER = "This tool provides decision support only and does not replace clinical judgment."
 
 
+@lru_cache(maxsize=None)
+def _page_shell(name: str) -> bytes:
+    return templates.get_template(name).render(disclaimer=DISCLAIMER, output=None).encode()
+
+
 class SecurityHeadersMiddleware(BaseHTTPMiddleware):
     async def dispatch(self, request: Request, call_next):
         response = await call_next(request)
@@ -48,33 +97,7 @@ app.add_middleware(SecurityHeadersMiddleware)
 app.add_middleware(TrustedHostMiddleware, allowed_hosts=allowed_hosts)
 
 
-@app.get("/")
-def home(request: Request):
-    return templates.TemplateResponse(
-        "pages/index.html",
-        {
-            "request": request,
-            "disclaimer": DISCLAIMER,
-        },
-    )
-
-
-@app.get("/student")
-def student_page(request: Request):
-    return templates.TemplateResponse(
-        "pages/student.html",
-        {
-            "request": request,
-            "disclaimer": DISCLAIMER,
-            "output": None,
-        },
-    )
-
-
-@app.post("/student")
-def student_submit(
-    request: Request,
-    db: Session = Depends(get_db),
+async def _patient_form(
     age: int = Form(...),
     sex: str = Form(...),
     chief_complaint: str = Form(...),
@@ -87,23 +110,42 @@ def student_submit(
     oxygen_saturation: str = Form(...),
     lab_values: str = Form(...),
     comorbidities: str = Form(""),
+) -> PatientRecord:
+    return PatientRecord(
+        age=age,
+        sex=sex,
+        chief_complaint=chief_complaint,
+        symptom_duration=symptom_duration,
+        symptoms=symptoms,
+        temperature=temperature,
+        pulse=pulse,
+        blood_pressure=blood_pressure,
+        respiratory_rate=respiratory_rate,
+        oxygen_saturation=oxygen_saturation,
+        lab_values=lab_values,
+        comorbidities=comorbidities,
+    )
+
+
+@app.get("/", response_class=HTMLResponse)
+async def home():
+    return HTMLResponse(_page_shell("pages/index.html"))
+
+
+@app.get("/student", response_class=HTMLResponse)
+async def student_page():
+    return HTMLResponse(_page_shell("pages/student.html"))
+
+
+@app.post("/student", response_class=HTMLResponse)
+async def student_submit(
+    request: Request,
+    db: Session = Depends(get_db),
+    patient: PatientRecord = Depends(_patient_form),
 ):
     _ = db
-    patient_data = _build_patient_dict(
-        age,
-        sex,
-        chief_complaint,
-        symptom_duration,
-        symptoms,
-        temperature,
-        pulse,
-        blood_pressure,
-        respiratory_rate,
-        oxygen_saturation,
-        lab_values,
-        comorbidities,
-    )
-    output = generate_clinical_analysis(patient_data, mode="student")
+    patient_data = asdict(patient)
+    output = await run_in_threadpool(generate_clinical_analysis, patient_data, mode="student")
     return templates.TemplateResponse(
         "pages/student.html",
         {
@@ -115,51 +157,27 @@ def student_submit(
     )
 
 
-@app.get("/clinician")
-def clinician_page(request: Request):
-    return templates.TemplateResponse(
-        "pages/clinician.html",
-        {
-            "request": request,
-            "disclaimer": DISCLAIMER,
-            "output": None,
-        },
-    )
+@app.post("/api/student")
+async def student_api(patient: PatientRecord = Depends(_patient_form)):
+    patient_data = asdict(patient)
+    output = await run_in_threadpool(generate_clinical_analysis, patient_data, mode="student")
+    return ORJSONResponse({"output": output, "patient": patient_data})
+
 
+@app.get("/clinician", response_class=HTMLResponse)
+async def clinician_page():
+    return HTMLResponse(_page_shell("pages/clinician.html"))
 
-@app.post("/clinician")
-def clinician_submit(
+
+@app.post("/clinician", response_class=HTMLResponse)
+async def clinician_submit(
     request: Request,
     db: Session = Depends(get_db),
-    age: int = Form(...),
-    sex: str = Form(...),
-    chief_complaint: str = Form(...),
-    symptom_duration: str = Form(...),
-    symptoms: str = Form(...),
-    temperature: str = Form(...),
-    pulse: str = Form(...),
-    blood_pressure: str = Form(...),
-    respiratory_rate: str = Form(...),
-    oxygen_saturation: str = Form(...),
-    lab_values: str = Form(...),
-    comorbidities: str = Form(""),
+    patient: PatientRecord = Depends(_patient_form),
 ):
     _ = db
-    patient_data = _build_patient_dict(
-        age,
-        sex,
-        chief_complaint,
-        symptom_duration,
-        symptoms,
-        temperature,
-        pulse,
-        blood_pressure,
-        respiratory_rate,
-        oxygen_saturation,
-        lab_values,
-        comorbidities,
-    )
-    output = generate_clinical_analysis(patient_data, mode="clinician")
+    patient_data = asdict(patient)
+    output = await run_in_threadpool(generate_clinical_analysis, patient_data, mode="clinician")
     return templates.TemplateResponse(
         "pages/clinician.html",
         {
@@ -171,10 +189,17 @@ def clinician_submit(
     )
 
 
-@app.get("/peripheral")
-def peripheral_page(request: Request, db: Session = Depends(get_db)):
-    centre = db.query(Centre).first()
-    if not _profile_exists(centre):
+@app.post("/api/clinician")
+async def clinician_api(patient: PatientRecord = Depends(_patient_form)):
+    patient_data = asdict(patient)
+    output = await run_in_threadpool(generate_clinical_analysis, patient_data, mode="clinician")
+    return ORJSONResponse({"output": output, "patient": patient_data})
+
+
+@app.get("/peripheral", response_class=HTMLResponse)
+async def peripheral_page(request: Request, db: Session = Depends(get_db)):
+    centre, existing = await run_in_threadpool(_load_centre, db)
+    if not existing:
         return RedirectResponse(url="/peripheral/setup", status_code=303)
 
     return templates.TemplateResponse(
@@ -188,44 +213,23 @@ def peripheral_page(request: Request, db: Session = Depends(get_db)):
     )
 
 
-@app.post("/peripheral")
-def peripheral_submit(
+@app.post("/peripheral", response_class=HTMLResponse)
+async def peripheral_submit(
     request: Request,
     db: Session = Depends(get_db),
-    age: int = Form(...),
-    sex: str = Form(...),
-    chief_complaint: str = Form(...),
-    symptom_duration: str = Form(...),
-    symptoms: str = Form(...),
-    temperature: str = Form(...),
-    pulse: str = Form(...),
-    blood_pressure: str = Form(...),
-    respiratory_rate: str = Form(...),
-    oxygen_saturation: str = Form(...),
-    lab_values: str = Form(...),
-    comorbidities: str = Form(""),
+    patient: PatientRecord = Depends(_patient_form),
 ):
-    centre = db.query(Centre).first()
-    if not _profile_exists(centre):
-        return RedirectResponse(url="/peripheral/setup", status_code=303)
+    patient_data = asdict(patient)
 
-    patient_data = _build_patient_dict(
-        age,
-        sex,
-        chief_complaint,
-        symptom_duration,
-        symptoms,
-        temperature,
-        pulse,
-        blood_pressure,
-        respiratory_rate,
-        oxygen_saturation,
-        lab_values,
-        comorbidities,
-    )
+    def triage() -> Tuple[Optional[Centre], Optional[Dict[str, Any]]]:
+        centre, existing = _load_centre(db)
+        if not existing:
+            return centre, None
+        return centre, run_resource_aware_triage(patient_data, centre)
 
-    _ = generate_clinical_analysis(patient_data, mode="peripheral")
-    output = run_resource_aware_triage(patient_data, centre)
+    centre, output = await run_in_threadpool(triage)
+    if output is None:
+        return RedirectResponse(url="/peripheral/setup", status_code=303)
 
     return templates.TemplateResponse(
         "pages/peripheral.html",
@@ -239,10 +243,9 @@ def peripheral_submit(
     )
 
 
-@app.get("/peripheral/setup")
-def peripheral_setup_page(request: Request, db: Session = Depends(get_db)):
-    centre = db.query(Centre).first()
-    existing = _profile_exists(centre)
+@app.get("/peripheral/setup", response_class=HTMLResponse)
+async def peripheral_setup_page(request: Request, db: Session = Depends(get_db)):
+    centre, existing = await run_in_threadpool(_load_centre, db)
     return templates.TemplateResponse(
         "pages/peripheral_setup.html",
         {
@@ -254,83 +257,76 @@ def peripheral_setup_page(request: Request, db: Session = Depends(get_db)):
     )
 
 
-@app.post("/peripheral/setup")
-def peripheral_setup_submit(
+@app.post("/peripheral/setup", response_class=HTMLResponse)
+async def peripheral_setup_submit(
     request: Request,
     db: Session = Depends(get_db),
     centre_name: str = Form(...),
-    oxygen: bool = Form(False),
-    suction: bool = Form(False),
-    iv_fluids: bool = Form(False),
-    nebulizer: bool = Form(False),
-    power_backup: bool = Form(False),
-    blood_glucose: bool = Form(False),
-    hemoglobin: bool = Form(False),
-    urine_test: bool = Form(False),
-    malaria_test: bool = Form(False),
-    ecg: bool = Form(False),
-    xray: bool = Form(False),
-    ultrasound: bool = Form(False),
-    start_iv: bool = Form(False),
-    give_im: bool = Form(False),
-    manage_airway: bool = Form(False),
-    intubate: bool = Form(False),
-    manage_shock: bool = Form(False),
-    monitor_vitals: bool = Form(False),
     medication_names: List[str] = Form([]),
     medication_stock: List[str] = Form([]),
 ):
-    centre = db.query(Centre).first()
-    if not centre:
-        centre = Centre(name=centre_name)
-        db.add(centre)
+    # Resource checkboxes are read by name from the flag tables in models.py.
+    form = await request.form()
+
+    def save() -> None:
+        centre = _get_centre(db)
+        if not centre:
+            centre = Centre(name=centre_name)
+            db.add(centre)
+            db.flush()
+
+        centre.name = centre_name
+
+        if not centre.infrastructure:
+            centre.infrastructure = Infrastructure(centre_id=centre.id)
+        centre.infrastructure.flags = _form_mask(form, INFRASTRUCTURE_FLAGS)
+
+        if not centre.diagnostics:
+            centre.diagnostics = Diagnostics(centre_id=centre.id)
+        centre.diagnostics.flags = _form_mask(form, DIAGNOSTICS_FLAGS)
+
+        if not centre.competencies:
+            centre.competencies = Competencies(centre_id=centre.id)
+        centre.competencies.flags = _form_mask(form, COMPETENCIES_FLAGS)
+
+        desired = {
+            med["drug_name"].lower(): med
+            for med in _parse_medications(medication_names, medication_stock)
+        }
+        kept = []
+        for med in list(centre.medications):
+            wanted = desired.pop(med.drug_name.lower(), None)
+            if wanted is None:
+                centre.medications.remove(med)
+            else:
+                kept.append((med, wanted))
+        # A flush orders UPDATEs before DELETEs, so drop the unwanted rows
+        # first; a re-spelt name can then never collide with one of them.
         db.flush()
+        for med, wanted in kept:
+            med.drug_name = wanted["drug_name"]
+            med.in_stock = wanted["in_stock"]
+
+        if desired:
+            db.execute(
+                Medication.__table__.insert(),
+                [
+                    {"centre_id": centre.id, "drug_name": med["drug_name"], "in_stock": med["in_stock"]}
+                    for med in desired.values()
+                ],
+            )
 
-    centre.name = centre_name
-
-    if not centre.infrastructure:
-        centre.infrastructure = Infrastructure(centre_id=centre.id)
-    centre.infrastructure.oxygen = oxygen
-    centre.infrastructure.suction = suction
-    centre.infrastructure.iv_fluids = iv_fluids
-    centre.infrastructure.nebulizer = nebulizer
-    centre.infrastructure.power_backup = power_backup
-
-    if not centre.diagnostics:
-        centre.diagnostics = Diagnostics(centre_id=centre.id)
-    centre.diagnostics.blood_glucose = blood_glucose
-    centre.diagnostics.hemoglobin = hemoglobin
-    centre.diagnostics.urine_test = urine_test
-    centre.diagnostics.malaria_test = malaria_test
-    centre.diagnostics.ecg = ecg
-    centre.diagnostics.xray = xray
-    centre.diagnostics.ultrasound = ultrasound
-
-    if not centre.competencies:
-        centre.competencies = Competencies(centre_id=centre.id)
-    centre.competencies.start_iv = start_iv
-    centre.competencies.give_im = give_im
-    centre.competencies.manage_airway = manage_airway
-    centre.competencies.intubate = intubate
-    centre.competencies.manage_shock = manage_shock
-    centre.competencies.monitor_vitals = monitor_vitals
-
-    for med in list(centre.medications):
-        db.delete(med)
-
-    meds = _parse_medications(medication_names, medication_stock)
-    for med in meds:
-        centre.medications.append(Medication(drug_name=med["drug_name"], in_stock=med["in_stock"]))
-
-    db.add(centre)
-    db.commit()
+        db.add(centre)
+        db.commit()
+
+    await run_in_threadpool(save)
 
     return RedirectResponse(url="/peripheral", status_code=303)
 
 
-@app.get("/peripheral/update")
-def peripheral_update_page(request: Request, db: Session = Depends(get_db)):
-    centre = db.query(Centre).first()
+@app.get("/peripheral/update", response_class=HTMLResponse)
+async def peripheral_update_page(request: Request, db: Session = Depends(get_db)):
+    centre, _ = await run_in_threadpool(_load_centre, db)
     if not centre:
         return RedirectResponse(url="/peripheral/setup", status_code=303)
 
@@ -345,50 +341,40 @@ def peripheral_update_page(request: Request, db: Session = Depends(get_db)):
     )
 
 
-def _build_patient_dict(
-    age: int,
-    sex: str,
-    chief_complaint: str,
-    symptom_duration: str,
-    symptoms: str,
-    temperature: str,
-    pulse: str,
-    blood_pressure: str,
-    respiratory_rate: str,
-    oxygen_saturation: str,
-    lab_values: str,
-    comorbidities: str,
-) -> Dict[str, str]:
-    return {
-        "age": age,
-        "sex": sex,
-        "chief_complaint": chief_complaint,
-        "symptom_duration": symptom_duration,
-        "symptoms": symptoms,
-        "temperature": temperature,
-        "pulse": pulse,
-        "blood_pressure": blood_pressure,
-        "respiratory_rate": respiratory_rate,
-        "oxygen_saturation": oxygen_saturation,
-        "lab_values": lab_values,
-        "comorbidities": comorbidities,
-    }
+def _get_centre(db: Session) -> Optional[Centre]:
+    return (
+        db.query(Centre)
+        .options(
+            joinedload(Centre.infrastructure),
+            joinedload(Centre.diagnostics),
+            joinedload(Centre.competencies),
+            selectinload(Centre.medications),
+        )
+        .first()
+    )
+
+
+def _load_centre(db: Session) -> Tuple[Optional[Centre], bool]:
+    centre = _get_centre(db)
+    return centre, _profile_exists(centre)
 
 
 def _profile_exists(centre: Centre | None) -> bool:
+    # The one-to-one profile rows are joined in by _get_centre, so this check
+    # never triggers a lazy load.
     if not centre:
         return False
     return bool(centre.infrastructure and centre.diagnostics and centre.competencies)
 
 
-def _parse_medications(names: List[str], stocks: List[str]) -> List[Dict[str, str]]:
-    out: List[Dict[str, str]] = []
-    stock_map = {item.lower().strip() for item in stocks}
+def _form_mask(form: FormData, flags: Tuple[Tuple[str, int], ...]) -> int:
+    return sum(bit for name, bit in flags if form.get(name, "").strip().lower() in _FORM_TRUE)
 
-    for name in names:
-        clean = name.strip()
-        if not clean:
-            continue
-        out.append({"drug_name": clean, "in_stock": clean.lower() in stock_map})
 
-    return out
+def _parse_medications(names: List[str], stocks: List[str]) -> List[Dict[str, str]]:
+    stock_set = {item.strip().lower() for item in stocks}
+    return [
+        {"drug_name": name, "in_stock": name.lower() in stock_set}
+        for name in (raw.strip() for raw in names)
+        if name
+    ]
@@ -0,0 +1,63 @@
+"""In-place upgrades for databases created by earlier versions of the models.
+
+`Base.metadata.create_all` only creates missing tables, so tables written by an
+older schema are brought forward here at startup. Each step checks the live
+schema first and is a no-op on an up-to-date database.
+"""
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection, Engine
+
+from .models import PROFILE_MODELS
+
+
+def upgrade_schema(engine: Engine) -> None:
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        # Older schemas stored one Boolean column per table entry instead of `flags`.
+        for model, columns in PROFILE_MODELS:
+            existing = {column["name"] for column in inspector.get_columns(model.__tablename__)}
+            if "flags" not in existing:
+                _pack_flag_columns(conn, model, [(name, bit) for name, bit in columns if name in existing])
+        if not _has_medication_unique(conn):
+            _add_medication_unique(conn)
+
+
+def _pack_flag_columns(conn: Connection, model, columns) -> None:
+    # The old Boolean columns are NOT NULL without a database default, so they
+    # cannot simply stay next to `flags`; rebuild the table and fold them in.
+    table = model.__table__
+    legacy = f"{table.name}_legacy"
+    packed = " + ".join(f"(CASE WHEN {name} THEN {bit} ELSE 0 END)" for name, bit in columns) or "0"
+
+    conn.execute(text(f"ALTER TABLE {table.name} RENAME TO {legacy}"))
+    table.create(conn)
+    conn.execute(text(f"INSERT INTO {table.name} (centre_id, flags) SELECT centre_id, {packed} FROM {legacy}"))
+    conn.execute(text(f"DROP TABLE {legacy}"))
+
+
+def _has_medication_unique(conn: Connection) -> bool:
+    # SQLAlchemy does not reflect SQLite expression indexes, so look it up by name.
+    query = text("SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = 'uq_med_centre_lower_drug'")
+    return conn.execute(query).first() is not None
+
+
+def _add_medication_unique(conn: Connection) -> None:
+    # Older versions could store the same drug twice for a centre, in any
+    # spelling. Keep the first-entered row, in stock if any duplicate was, and
+    # drop the rest; the case-sensitive index of earlier upgrades goes too.
+    conn.execute(
+        text(
+            "UPDATE medications SET in_stock = ("
+            "SELECT MAX(dup.in_stock) FROM medications AS dup "
+            "WHERE dup.centre_id = medications.centre_id AND lower(dup.drug_name) = lower(medications.drug_name))"
+        )
+    )
+    conn.execute(
+        text(
+            "DELETE FROM medications WHERE id NOT IN "
+            "(SELECT MIN(id) FROM medications GROUP BY centre_id, lower(drug_name))"
+        )
+    )
+    conn.execute(text("DROP INDEX IF EXISTS uq_med_centre_drug"))
+    conn.execute(text("CREATE UNIQUE INDEX uq_med_centre_lower_drug ON medications (centre_id, lower(drug_name))"))
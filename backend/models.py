@@ -1,21 +1,88 @@
-from datetime import datetime
-
-from sqlalchemy import Boolean, Column, DateTime, ForeignKey, Integer, String
+from sqlalchemy import BigInteger, Boolean, Column, DateTime, ForeignKey, Index, Integer, String, func
+from sqlalchemy.ext.hybrid import hybrid_property
 from sqlalchemy.orm import relationship
 
 from .database import Base
 
+# Resource flag bits. Each table packs its booleans into one `flags` column;
+# bits are unique across tables so the three masks can be OR-ed together.
+OXYGEN = 1 << 0
+SUCTION = 1 << 1
+IV_FLUIDS = 1 << 2
+NEBULIZER = 1 << 3
+POWER_BACKUP = 1 << 4
+
+BLOOD_GLUCOSE = 1 << 5
+HEMOGLOBIN = 1 << 6
+URINE_TEST = 1 << 7
+MALARIA_TEST = 1 << 8
+ECG = 1 << 9
+XRAY = 1 << 10
+ULTRASOUND = 1 << 11
+
+START_IV = 1 << 12
+GIVE_IM = 1 << 13
+MANAGE_AIRWAY = 1 << 14
+INTUBATE = 1 << 15
+MANAGE_SHOCK = 1 << 16
+MONITOR_VITALS = 1 << 17
+
+# The one name -> bit table per profile model. Legacy column names, setup-form
+# fields and triage output names are all derived from these.
+INFRASTRUCTURE_FLAGS = (
+    ("oxygen", OXYGEN),
+    ("suction", SUCTION),
+    ("iv_fluids", IV_FLUIDS),
+    ("nebulizer", NEBULIZER),
+    ("power_backup", POWER_BACKUP),
+)
+DIAGNOSTICS_FLAGS = (
+    ("blood_glucose", BLOOD_GLUCOSE),
+    ("hemoglobin", HEMOGLOBIN),
+    ("urine_test", URINE_TEST),
+    ("malaria_test", MALARIA_TEST),
+    ("ecg", ECG),
+    ("xray", XRAY),
+    ("ultrasound", ULTRASOUND),
+)
+COMPETENCIES_FLAGS = (
+    ("start_iv", START_IV),
+    ("give_im", GIVE_IM),
+    ("manage_airway", MANAGE_AIRWAY),
+    ("intubate", INTUBATE),
+    ("manage_shock", MANAGE_SHOCK),
+    ("monitor_vitals", MONITOR_VITALS),
+)
+RESOURCE_FLAGS = INFRASTRUCTURE_FLAGS + DIAGNOSTICS_FLAGS + COMPETENCIES_FLAGS
+
+
+def _flag(bit: int) -> hybrid_property:
+    def getter(self) -> bool:
+        return bool((self.flags or 0) & bit)
+
+    def setter(self, value: bool) -> None:
+        flags = self.flags or 0
+        self.flags = flags | bit if value else flags & ~bit
+
+    def expression(cls):
+        return cls.flags.op("&")(bit) != 0
+
+    return hybrid_property(getter, setter, expr=expression)
+
 
 class Centre(Base):
     __tablename__ = "centres"
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, nullable=False, default="Default Centre")
-    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    # default= renders CURRENT_TIMESTAMP into the INSERT itself, so tables
+    # created before server_default existed (no DB default) still get a value.
+    created_at = Column(DateTime, default=func.now(), server_default=func.now(), nullable=False)
     updated_at = Column(
         DateTime,
-        default=datetime.utcnow,
-        onupdate=datetime.utcnow,
+        default=func.now(),
+        server_default=func.now(),
+        onupdate=func.now(),
         nullable=False,
     )
 
@@ -26,18 +93,27 @@ class Centre(Base):
         "Medication",
         back_populates="centre",
         cascade="all, delete-orphan",
+        order_by="Medication.id",
     )
 
+    @property
+    def resource_mask(self) -> int:
+        """Every available infrastructure, diagnostic and competency bit."""
+        infrastructure = self.infrastructure
+        diagnostics = self.diagnostics
+        competencies = self.competencies
+        return (
+            (infrastructure.flags or 0 if infrastructure else 0)
+            | (diagnostics.flags or 0 if diagnostics else 0)
+            | (competencies.flags or 0 if competencies else 0)
+        )
+
 
 class Infrastructure(Base):
     __tablename__ = "infrastructure"
 
     centre_id = Column(Integer, ForeignKey("centres.id"), primary_key=True)
-    oxygen = Column(Boolean, default=False, nullable=False)
-    suction = Column(Boolean, default=False, nullable=False)
-    iv_fluids = Column(Boolean, default=False, nullable=False)
-    nebulizer = Column(Boolean, default=False, nullable=False)
-    power_backup = Column(Boolean, default=False, nullable=False)
+    flags = Column(BigInteger, default=0, nullable=False)
 
     centre = relationship("Centre", back_populates="infrastructure")
 
@@ -46,13 +122,7 @@ class Diagnostics(Base):
     __tablename__ = "diagnostics"
 
     centre_id = Column(Integer, ForeignKey("centres.id"), primary_key=True)
-    blood_glucose = Column(Boolean, default=False, nullable=False)
-    hemoglobin = Column(Boolean, default=False, nullable=False)
-    urine_test = Column(Boolean, default=False, nullable=False)
-    malaria_test = Column(Boolean, default=False, nullable=False)
-    ecg = Column(Boolean, default=False, nullable=False)
-    xray = Column(Boolean, default=False, nullable=False)
-    ultrasound = Column(Boolean, default=False, nullable=False)
+    flags = Column(BigInteger, default=0, nullable=False)
 
     centre = relationship("Centre", back_populates="diagnostics")
 
@@ -61,16 +131,22 @@ class Competencies(Base):
     __tablename__ = "competencies"
 
     centre_id = Column(Integer, ForeignKey("centres.id"), primary_key=True)
-    start_iv = Column(Boolean, default=False, nullable=False)
-    give_im = Column(Boolean, default=False, nullable=False)
-    manage_airway = Column(Boolean, default=False, nullable=False)
-    intubate = Column(Boolean, default=False, nullable=False)
-    manage_shock = Column(Boolean, default=False, nullable=False)
-    monitor_vitals = Column(Boolean, default=False, nullable=False)
+    flags = Column(BigInteger, default=0, nullable=False)
 
     centre = relationship("Centre", back_populates="competencies")
 
 
+# One boolean hybrid per table entry, e.g. Infrastructure.oxygen.
+PROFILE_MODELS = (
+    (Infrastructure, INFRASTRUCTURE_FLAGS),
+    (Diagnostics, DIAGNOSTICS_FLAGS),
+    (Competencies, COMPETENCIES_FLAGS),
+)
+for _model, _flags in PROFILE_MODELS:
+    for _name, _bit in _flags:
+        setattr(_model, _name, _flag(_bit))
+
+
 class Medication(Base):
     __tablename__ = "medications"
 
@@ -80,3 +156,8 @@ class Medication(Base):
     in_stock = Column(Boolean, default=False, nullable=False)
 
     centre = relationship("Centre", back_populates="medications")
+
+
+# The setup form matches drug names case-insensitively, so uniqueness folds
+# case the same way.
+Index("uq_med_centre_lower_drug", Medication.centre_id, func.lower(Medication.drug_name), unique=True)
@@ -1,31 +1,172 @@
 import re
+from functools import lru_cache
 from typing import Any, Dict, List, Optional, Tuple
 
+_NUM_RE = re.compile(r"-?\d+(\.\d+)?")
+_BP_RE = re.compile(r"(\d{2,3})\s*/\s*(\d{2,3})")
+
+_FEVER = 1 << 0
+_HYPOTENSION = 1 << 1
+_TACHYCARDIA = 1 << 2
+_TACHYPNEA = 1 << 3
+_HYPOXIA = 1 << 4
+
+_TEXT_KEYS = ("chief_complaint", "symptoms", "lab_values", "comorbidities")
+
+_CATEGORY_KEYWORDS = (
+    ("respiratory", ("cough", "breath", "wheeze", "chest")),
+    ("gi", ("vomit", "diarrhea", "abdominal", "abdomen")),
+    ("neuro", ("seizure", "confus", "weakness", "stroke", "headache")),
+    ("urinary", ("dysuria", "urine", "flank")),
+)
+
+_RESP_DIFFS: Tuple[Dict[str, str], ...] = (
+    {
+        "diagnosis": "Lower respiratory tract infection (e.g., pneumonia)",
+        "reasoning": "Respiratory symptom cluster with available vital-sign context supports pulmonary infection.",
+    },
+    {
+        "diagnosis": "Acute exacerbation of obstructive airway disease",
+        "reasoning": "Breathlessness/wheeze pattern can represent airway inflammation or bronchospasm.",
+    },
+    {
+        "diagnosis": "Pulmonary vascular/cardiac cause",
+        "reasoning": "Dyspnea and chest symptoms require exclusion of cardiopulmonary emergencies.",
+    },
+)
+
+_GI_DIFFS: Tuple[Dict[str, str], ...] = (
+    {
+        "diagnosis": "Acute infectious gastroenteritis",
+        "reasoning": "GI-predominant symptoms with acute duration suggest infectious cause.",
+    },
+    {
+        "diagnosis": "Intra-abdominal inflammatory process",
+        "reasoning": "Persistent abdominal symptoms can indicate surgical or inflammatory pathology.",
+    },
+    {
+        "diagnosis": "Volume depletion/electrolyte disturbance",
+        "reasoning": "Fluid losses and poor intake can produce systemic instability.",
+    },
+)
+
+_NEURO_DIFFS: Tuple[Dict[str, str], ...] = (
+    {
+        "diagnosis": "Acute cerebrovascular event",
+        "reasoning": "Focal neurologic complaints require urgent vascular evaluation.",
+    },
+    {
+        "diagnosis": "CNS infection/inflammation",
+        "reasoning": "Neurologic symptoms with systemic illness can indicate CNS pathology.",
+    },
+    {
+        "diagnosis": "Metabolic/toxic encephalopathy",
+        "reasoning": "Altered cognition or neurologic change may be secondary to systemic derangement.",
+    },
+)
+
+_DEFAULT_DIFFS: Tuple[Dict[str, str], ...] = (
+    {
+        "diagnosis": "Infection-related acute illness",
+        "reasoning": "Common cause of undifferentiated acute presentations.",
+    },
+    {
+        "diagnosis": "Cardiopulmonary process",
+        "reasoning": "Vital-sign abnormalities can represent primary heart/lung pathology.",
+    },
+    {
+        "diagnosis": "Metabolic or dehydration-related illness",
+        "reasoning": "Systemic symptoms can stem from fluid, glucose, or electrolyte imbalance.",
+    },
+)
+
+_SYNDROME_TABLE: Tuple[Tuple[str, str, Tuple[Dict[str, str], ...]], ...] = (
+    ("respiratory", "Acute respiratory syndrome", _RESP_DIFFS),
+    ("gi", "Acute gastrointestinal syndrome", _GI_DIFFS),
+    ("neuro", "Acute neurologic syndrome", _NEURO_DIFFS),
+)
+
+_CATEGORY_NEXT_TESTS = (
+    ("respiratory", "Chest imaging and pulse oximetry trend"),
+    ("neuro", "Urgent neuro exam and neuroimaging if deficits present"),
+    ("urinary", "Urinalysis and renal function"),
+)
+
 
 def _to_float(value: Any) -> Optional[float]:
     if value is None:
         return None
-    match = re.search(r"-?\d+(\.\d+)?", str(value))
+    # bool is an int subclass but str(True) has no digits, and float reprs
+    # may use exponents or nan/inf; only plain ints skip the regex.
+    if type(value) is int:
+        return float(value)
+    match = _NUM_RE.search(str(value))
     return float(match.group()) if match else None
 
 
 def _parse_bp(bp: Any) -> Tuple[Optional[int], Optional[int]]:
     if bp is None:
         return None, None
-    match = re.search(r"(\d{2,3})\s*/\s*(\d{2,3})", str(bp))
+    text = bp if isinstance(bp, str) else str(bp)
+
+    # Fast path for the common "120/80" / "120 / 80 mmHg" shapes.
+    left, sep, right = text.partition("/")
+    if sep:
+        systolic = left.strip()
+        rest = right.split(None, 1)
+        # str.isdecimal is the same Nd class as the regex's \d.
+        if rest and 2 <= len(systolic) <= 3 and 2 <= len(rest[0]) <= 3 and systolic.isdecimal() and rest[0].isdecimal():
+            return int(systolic), int(rest[0])
+
+    match = _BP_RE.search(text)
     if not match:
         return None, None
     return int(match.group(1)), int(match.group(2))
 
 
+def _vitals_flags(
+    temp: Optional[float],
+    pulse: Optional[float],
+    rr: Optional[float],
+    spo2: Optional[float],
+    sbp: Optional[int],
+) -> int:
+    flags = 0
+    if temp is not None and temp >= 38:
+        flags |= _FEVER
+    if sbp is not None and sbp < 90:
+        flags |= _HYPOTENSION
+    if pulse is not None and pulse >= 110:
+        flags |= _TACHYCARDIA
+    if rr is not None and rr >= 24:
+        flags |= _TACHYPNEA
+    if spo2 is not None and spo2 < 92:
+        flags |= _HYPOXIA
+    return flags
+
+
+def _text_value(value: Any) -> str:
+    # Form values are already strings; None (an unset Optional field) reads as
+    # empty, and anything else is formatted as str() always did.
+    if value is None:
+        return ""
+    return value if isinstance(value, str) else str(value)
+
+
 def _normalize_text(patient_data: Dict[str, Any]) -> str:
-    pieces = [
-        str(patient_data.get("chief_complaint", "")),
-        str(patient_data.get("symptoms", "")),
-        str(patient_data.get("lab_values", "")),
-        str(patient_data.get("comorbidities", "")),
-    ]
-    return " ".join(pieces).lower()
+    return " ".join(_text_value(patient_data.get(key)) for key in _TEXT_KEYS).lower()
+
+
+def _detect_categories(text: str) -> Dict[str, bool]:
+    categories: Dict[str, bool] = {}
+    for category, words in _CATEGORY_KEYWORDS:
+        hit = False
+        for word in words:
+            if word in text:
+                hit = True
+                break
+        categories[category] = hit
+    return categories
 
 
 def _derive_case_features(patient_data: Dict[str, Any]) -> Dict[str, Any]:
@@ -36,27 +177,25 @@ def _derive_case_features(patient_data: Dict[str, Any]) -> Dict[str, Any]:
     spo2 = _to_float(patient_data.get("oxygen_saturation"))
     sbp, _ = _parse_bp(patient_data.get("blood_pressure"))
 
-    fever = temp is not None and temp >= 38
-    hypotension = sbp is not None and sbp < 90
-    tachycardia = pulse is not None and pulse >= 110
-    tachypnea = rr is not None and rr >= 24
-    hypoxia = spo2 is not None and spo2 < 92
-
-    respiratory_symptoms = any(word in text for word in ["cough", "breath", "wheeze", "chest"])
-    gi_symptoms = any(word in text for word in ["vomit", "diarrhea", "abdominal", "abdomen"])
-    neuro_symptoms = any(word in text for word in ["seizure", "confus", "weakness", "stroke", "headache"])
-    urinary_symptoms = any(word in text for word in ["dysuria", "urine", "flank"])
-
-    if respiratory_symptoms:
-        syndrome = "Acute respiratory syndrome"
-    elif gi_symptoms:
-        syndrome = "Acute gastrointestinal syndrome"
-    elif neuro_symptoms:
-        syndrome = "Acute neurologic syndrome"
-    elif fever:
-        syndrome = "Acute febrile illness syndrome"
+    vitals = _vitals_flags(temp, pulse, rr, spo2, sbp)
+    fever = bool(vitals & _FEVER)
+    hypotension = bool(vitals & _HYPOTENSION)
+    tachycardia = bool(vitals & _TACHYCARDIA)
+    tachypnea = bool(vitals & _TACHYPNEA)
+    hypoxia = bool(vitals & _HYPOXIA)
+
+    categories = _detect_categories(text)
+    respiratory_symptoms = categories["respiratory"]
+    gi_symptoms = categories["gi"]
+    neuro_symptoms = categories["neuro"]
+
+    for category, label, diffs in _SYNDROME_TABLE:
+        if categories[category]:
+            syndrome, differentials = label, diffs
+            break
     else:
-        syndrome = "Undifferentiated acute illness syndrome"
+        syndrome = "Acute febrile illness syndrome" if fever else "Undifferentiated acute illness syndrome"
+        differentials = _DEFAULT_DIFFS
 
     red_flags: List[str] = []
     if hypotension:
@@ -73,84 +212,6 @@ def _derive_case_features(patient_data: Dict[str, Any]) -> Dict[str, Any]:
     if not red_flags:
         red_flags = ["No immediate physiologic red flags from provided vitals"]
 
-    differentials: List[Dict[str, str]] = []
-    if respiratory_symptoms:
-        differentials.append(
-            {
-                "diagnosis": "Lower respiratory tract infection (e.g., pneumonia)",
-                "reasoning": "Respiratory symptom cluster with available vital-sign context supports pulmonary infection.",
-            }
-        )
-        differentials.append(
-            {
-                "diagnosis": "Acute exacerbation of obstructive airway disease",
-                "reasoning": "Breathlessness/wheeze pattern can represent airway inflammation or bronchospasm.",
-            }
-        )
-        differentials.append(
-            {
-                "diagnosis": "Pulmonary vascular/cardiac cause",
-                "reasoning": "Dyspnea and chest symptoms require exclusion of cardiopulmonary emergencies.",
-            }
-        )
-    elif gi_symptoms:
-        differentials.append(
-            {
-                "diagnosis": "Acute infectious gastroenteritis",
-                "reasoning": "GI-predominant symptoms with acute duration suggest infectious cause.",
-            }
-        )
-        differentials.append(
-            {
-                "diagnosis": "Intra-abdominal inflammatory process",
-                "reasoning": "Persistent abdominal symptoms can indicate surgical or inflammatory pathology.",
-            }
-        )
-        differentials.append(
-            {
-                "diagnosis": "Volume depletion/electrolyte disturbance",
-                "reasoning": "Fluid losses and poor intake can produce systemic instability.",
-            }
-        )
-    elif neuro_symptoms:
-        differentials.append(
-            {
-                "diagnosis": "Acute cerebrovascular event",
-                "reasoning": "Focal neurologic complaints require urgent vascular evaluation.",
-            }
-        )
-        differentials.append(
-            {
-                "diagnosis": "CNS infection/inflammation",
-                "reasoning": "Neurologic symptoms with systemic illness can indicate CNS pathology.",
-            }
-        )
-        differentials.append(
-            {
-                "diagnosis": "Metabolic/toxic encephalopathy",
-                "reasoning": "Altered cognition or neurologic change may be secondary to systemic derangement.",
-            }
-        )
-    else:
-        differentials.append(
-            {
-                "diagnosis": "Infection-related acute illness",
-                "reasoning": "Common cause of undifferentiated acute presentations.",
-            }
-        )
-        differentials.append(
-            {
-                "diagnosis": "Cardiopulmonary process",
-                "reasoning": "Vital-sign abnormalities can represent primary heart/lung pathology.",
-            }
-        )
-        differentials.append(
-            {
-                "diagnosis": "Metabolic or dehydration-related illness",
-                "reasoning": "Systemic symptoms can stem from fluid, glucose, or electrolyte imbalance.",
-            }
-        )
-
     supporting = [
         str(patient_data.get("chief_complaint", "")),
         str(patient_data.get("symptoms", ""))[:180] or "Symptom cluster provided",
@@ -177,12 +238,7 @@ def _derive_case_features(patient_data: Dict[str, Any]) -> Dict[str, Any]:
         rule_outs.insert(0, "Severe dehydration with circulatory compromise")
 
     next_tests = ["Point-of-care glucose", "CBC and basic metabolic panel"]
-    if respiratory_symptoms:
-        next_tests.append("Chest imaging and pulse oximetry trend")
-    if neuro_symptoms:
-        next_tests.append("Urgent neuro exam and neuroimaging if deficits present")
-    if urinary_symptoms:
-        next_tests.append("Urinalysis and renal function")
+    next_tests.extend(test for category, test in _CATEGORY_NEXT_TESTS if categories[category])
 
     if hypotension or hypoxia:
         disposition = "Admit"
@@ -215,16 +271,17 @@ def _build_problem_representation(patient_data: Dict[str, Any], features: Dict[s
     spo2 = _to_float(patient_data.get("oxygen_saturation"))
     sbp, dbp = _parse_bp(patient_data.get("blood_pressure"))
 
+    flags = _vitals_flags(temp, pulse, rr, spo2, sbp)
     vitals = []
-    if temp is not None and temp >= 38:
+    if flags & _FEVER:
         vitals.append(f"fever {temp:g}C")
-    if sbp is not None and sbp < 90:
+    if flags & _HYPOTENSION:
         vitals.append(f"hypotension {sbp}/{dbp if dbp is not None else '?'}")
-    if pulse is not None and pulse >= 110:
+    if flags & _TACHYCARDIA:
         vitals.append(f"tachycardia {pulse:g}/min")
-    if rr is not None and rr >= 24:
+    if flags & _TACHYPNEA:
         vitals.append(f"tachypnea {rr:g}/min")
-    if spo2 is not None and spo2 < 92:
+    if flags & _HYPOXIA:
         vitals.append(f"hypoxia SpO2 {spo2:g}%")
 
     comorb = str(patient_data.get("comorbidities", "")).strip()
@@ -238,8 +295,27 @@ def _build_problem_representation(patient_data: Dict[str, Any], features: Dict[s
 
 
 def generate_clinical_analysis(patient_data: Dict[str, Any], mode: str) -> Dict[str, Any]:
-    """Mock LLM interface. Replace internals with a real API later."""
-    complaint = patient_data.get("chief_complaint", "Undifferentiated presentation")
+    """Mock LLM interface. Replace internals with a real API later.
+
+    Results are memoized per (patient_data, mode); callers must treat the
+    returned structure as read-only.
+    """
+    # Only key construction may fail on unhashable values; errors raised while
+    # deriving the analysis itself must propagate.
+    try:
+        key = tuple(sorted(patient_data.items()))
+        hash(key)
+    except TypeError:
+        return _derive_and_format(patient_data, mode)
+    return _cached_analysis(key, mode)
+
+
+@lru_cache(maxsize=512)
+def _cached_analysis(frozen_items: Tuple[Tuple[str, Any], ...], mode: str) -> Dict[str, Any]:
+    return _derive_and_format(dict(frozen_items), mode)
+
+
+def _derive_and_format(patient_data: Dict[str, Any], mode: str) -> Dict[str, Any]:
     features = _derive_case_features(patient_data)
 
     if mode == "student":
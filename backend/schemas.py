@@ -1,3 +1,4 @@
+from dataclasses import dataclass
 from typing import List, Optional
 
 from pydantic import BaseModel, Field
@@ -18,6 +19,22 @@ class PatientInput(BaseModel):
     comorbidities: Optional[str] = ""
 
 
+@dataclass(frozen=True, slots=True)
+class PatientRecord:
+    age: int
+    sex: str
+    chief_complaint: str
+    symptom_duration: str
+    symptoms: str
+    temperature: str
+    pulse: str
+    blood_pressure: str
+    respiratory_rate: str
+    oxygen_saturation: str
+    lab_values: str
+    comorbidities: str = ""
+
+
 class MedicationInput(BaseModel):
     drug_name: str
     in_stock: bool = False
@@ -1,162 +1,285 @@
 import re
-from typing import Any, Dict, List, Optional, Set
-
-from .models import Centre
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from .models import (
+    BLOOD_GLUCOSE,
+    ECG,
+    IV_FLUIDS,
+    MALARIA_TEST,
+    MANAGE_AIRWAY,
+    MANAGE_SHOCK,
+    MONITOR_VITALS,
+    OXYGEN,
+    RESOURCE_FLAGS,
+    START_IV,
+    XRAY,
+    Centre,
+)
+
+_FLOAT_RE = re.compile(r"-?\d+(\.\d+)?")
+
+# Case-text pattern buckets. Resource inference and differential ranking use
+# slightly different keyword lists, so each variant gets its own bit.
+_RESPIRATORY = 1 << 0
+_GI = 1 << 1
+_NEURO = 1 << 2
+_CHEST_PAIN = 1 << 3
+_MALARIA = 1 << 4
+_RESPIRATORY_DX = 1 << 5
+_GI_DX = 1 << 6
+_MALARIA_DX = 1 << 7
+_URINARY = 1 << 8
+_EDEMA = 1 << 9
+_GLUCOSE = 1 << 10
+
+_PATTERN_KEYWORDS = (
+    (_RESPIRATORY, ("cough", "breath", "dyspnea", "wheeze", "chest")),
+    (_GI, ("vomit", "diarrhea", "diarrhoea", "abdominal", "dehydration")),
+    (_NEURO, ("confus", "seizure", "unconscious", "stroke", "weakness")),
+    (_CHEST_PAIN, ("chest pain", "tightness", "pressure chest")),
+    (_MALARIA, ("chills", "rigors", "malaria")),
+    (_RESPIRATORY_DX, ("cough", "dyspnea", "breath", "sputum", "wheeze")),
+    (_GI_DX, ("vomit", "diarrhea", "diarrhoea", "abdominal")),
+    (_MALARIA_DX, ("rigor", "chills", "malaria")),
+    (_URINARY, ("dysuria", "urine", "flank")),
+    (_EDEMA, ("orthopnea", "pnd", "edema", "swelling legs")),
+    (_GLUCOSE, ("glucose", "sugar")),
+)
+
+
+def _keyword_bits() -> Tuple[Tuple[str, int], ...]:
+    merged: Dict[str, int] = {}
+    for bit, words in _PATTERN_KEYWORDS:
+        for word in words:
+            merged[word] = merged.get(word, 0) | bit
+    return tuple(merged.items())
+
+
+# Each distinct keyword mapped to every bucket it belongs to, so the case text
+# is searched at most once per keyword.
+_KEYWORD_BITS = _keyword_bits()
 
 
 def _to_float(value: Any) -> Optional[float]:
     if value is None:
         return None
-    match = re.search(r"-?\d+(\.\d+)?", str(value))
+    # bool is an int subclass but str(True) has no digits, and float reprs
+    # may use exponents or nan/inf; only plain ints skip the regex.
+    if type(value) is int:
+        return float(value)
+    text = value if isinstance(value, str) else str(value)
+    # float() also takes exponents, "nan", ".5" and underscores, so it is only
+    # trusted on strings the regex would match in full.
+    number = text.strip()
+    whole, point, fraction = (number[1:] if number[:1] == "-" else number).partition(".")
+    if whole.isdecimal() and (not point or fraction.isdecimal()):
+        return float(number)
+    match = _FLOAT_RE.search(text)
     return float(match.group()) if match else None
 
 
-def _parse_bp(bp: str) -> Optional[int]:
+def _parse_bp(bp: Any) -> Optional[int]:
     if not bp:
         return None
-    match = re.match(r"\s*(\d{2,3})\s*/\s*(\d{2,3})\s*", str(bp))
-    if not match:
-        return None
-    return int(match.group(1))
+    text = bp if isinstance(bp, str) else str(bp)
+
+    # Accepts exactly what the anchored "\s*(\d{2,3})\s*/\s*(\d{2,3})" match
+    # did (str.isdecimal is the same Nd class as \d); only systolic is used.
+    left, sep, right = text.partition("/")
+    systolic = left.strip()
+    diastolic = right.lstrip()[:2]
+    if sep and 2 <= len(systolic) <= 3 and systolic.isdecimal() and len(diastolic) == 2 and diastolic.isdecimal():
+        return int(systolic)
+    return None
 
 
 def _case_text(patient_data: Dict[str, Any]) -> str:
-    return " ".join(
-        [
-            str(patient_data.get("chief_complaint", "")),
-            str(patient_data.get("symptoms", "")),
-            str(patient_data.get("lab_values", "")),
-            str(patient_data.get("comorbidities", "")),
-        ]
+    # One formatted buffer keeps the keyword loop to a single pass; scanning
+    # each field on its own repeats the loop four times and costs more.
+    get = patient_data.get
+    return (
+        f"{get('chief_complaint', '')} {get('symptoms', '')} "
+        f"{get('lab_values', '')} {get('comorbidities', '')}"
     ).lower()
 
 
-def _rank_top_differentials(patient_data: Dict[str, Any], assessment: Dict[str, Any]) -> List[Dict[str, str]]:
-    text = _case_text(patient_data)
-    temp = _to_float(patient_data.get("temperature"))
-    pulse = _to_float(patient_data.get("pulse"))
-    spo2 = _to_float(patient_data.get("oxygen_saturation"))
-    systolic = _parse_bp(str(patient_data.get("blood_pressure", "")))
+def _pattern_bits(text: str) -> int:
+    # Plain substring checks rather than one alternation regex: a regex scan
+    # consumes each match, so overlapping keywords ("rigors"/"rigor",
+    # "chest pain"/"chest") would be missed, and the lookahead form that
+    # finds them is slower than these scans.
+    bits = 0
+    for word, word_bits in _KEYWORD_BITS:
+        if word_bits & ~bits and word in text:
+            bits |= word_bits
+    return bits
+
+
+# Candidate diagnoses in tie-break order for the ranking below.
+_DX_NAMES = (
+    "Community-acquired pneumonia / lower respiratory tract infection",
+    "Acute asthma/COPD exacerbation",
+    "Sepsis with hemodynamic compromise",
+    "Acute coronary syndrome / cardiac ischemia",
+    "Pulmonary edema / heart failure exacerbation",
+    "Acute gastroenteritis with dehydration",
+    "Hypoglycemia or glucose-related metabolic emergency",
+    "Acute neurologic emergency (stroke/seizure/CNS event)",
+    "Malaria or other febrile parasitic illness",
+    "Urinary sepsis / pyelonephritis",
+)
+(
+    _DX_PNEUMONIA,
+    _DX_ASTHMA,
+    _DX_SEPSIS,
+    _DX_ACS,
+    _DX_HEART_FAILURE,
+    _DX_GASTRO,
+    _DX_GLUCOSE,
+    _DX_NEURO,
+    _DX_MALARIA,
+    _DX_URINARY,
+) = range(len(_DX_NAMES))
+
+# Condition bits for the differential scorer, above the pattern buckets.
+_FEVER = 1 << 11
+_HYPOXIA = 1 << 12
+_HYPOTENSION = 1 << 13
+_TACHY = 1 << 14
+_HIGH_RISK = 1 << 15
+
+# Score rules in evaluation order: a rule fires when every bit of its mask is
+# set, and the first rule to fire for a diagnosis supplies its reason.
+_DX_RULES = (
+    (_RESPIRATORY_DX, _DX_PNEUMONIA, 3, "Respiratory symptom cluster is present."),
+    (_RESPIRATORY_DX, _DX_ASTHMA, 2, "Breathlessness/wheeze pattern suggests obstructive airway disease."),
+    (_FEVER, _DX_PNEUMONIA, 2, "Fever increases likelihood of infection."),
+    (_FEVER, _DX_SEPSIS, 2, "Fever with systemic illness supports sepsis consideration."),
+    (_FEVER, _DX_MALARIA, 1, "Fever compatible with tropical febrile illness."),
+    (_HYPOXIA, _DX_PNEUMONIA, 2, "Low oxygen saturation supports pulmonary process."),
+    (_HYPOXIA, _DX_HEART_FAILURE, 2, "Hypoxia may indicate cardiopulmonary fluid overload."),
+    (_HYPOTENSION, _DX_SEPSIS, 4, "Hypotension indicates potential circulatory failure."),
+    (_HYPOTENSION, _DX_GASTRO, 2, "Hypotension can result from severe volume depletion."),
+    (_TACHY, _DX_SEPSIS, 1, "Tachycardia supports systemic stress response."),
+    (_TACHY, _DX_GASTRO, 1, "Tachycardia can indicate dehydration."),
+    (_CHEST_PAIN, _DX_ACS, 4, "Chest pain/tightness requires cardiac rule-out."),
+    (_CHEST_PAIN, _DX_HEART_FAILURE, 2, "Cardiorespiratory symptoms overlap with heart failure states."),
+    (_EDEMA, _DX_HEART_FAILURE, 3, "Fluid overload symptoms support heart failure."),
+    (_GI_DX, _DX_GASTRO, 4, "GI losses strongly suggest gastroenteritis/dehydration."),
+    (_NEURO, _DX_NEURO, 5, "Neurologic danger terms are present."),
+    (_URINARY | _FEVER, _DX_URINARY, 4, "Urinary symptoms with fever suggest urinary source infection."),
+    (_GLUCOSE, _DX_GLUCOSE, 3, "Glucose-related concern appears in case data."),
+    (_MALARIA_DX | _FEVER, _DX_MALARIA, 4, "Fever with rigors/chills raises malaria risk where relevant."),
+    (_HIGH_RISK, _DX_SEPSIS, 1, "High-risk physiology increases concern for systemic critical illness."),
+)
+
+_UNDIFFERENTIATED = {
+    "diagnosis": "Undifferentiated acute illness (needs serial reassessment)",
+    "reasoning": "Limited discriminating features in submitted data.",
+}
+
+
+class _ParsedCase(NamedTuple):
+    patterns: int
+    systolic: Optional[int]
+    oxygen_sat: Optional[float]
+    temp: Optional[float]
+    pulse: Optional[float]
+    resp_rate: Optional[float]
+
+
+class _Assessment(NamedTuple):
+    risk_level: str
+    flags: List[str]
+    required_resources: int
+    stabilization_steps: List[str]
+    findings: int
+
+
+def _parse_patient(patient_data: Dict[str, Any]) -> _ParsedCase:
+    return _ParsedCase(
+        patterns=_pattern_bits(_case_text(patient_data)),
+        systolic=_parse_bp(patient_data.get("blood_pressure")),
+        oxygen_sat=_to_float(patient_data.get("oxygen_saturation")),
+        temp=_to_float(patient_data.get("temperature")),
+        pulse=_to_float(patient_data.get("pulse")),
+        resp_rate=_to_float(patient_data.get("respiratory_rate")),
+    )
+
 
-    fever = temp is not None and temp >= 38.0
-    hypotension = systolic is not None and systolic < 90
-    hypoxia = spo2 is not None and spo2 < 92
-    tachy = pulse is not None and pulse >= 110
-
-    candidates: List[Dict[str, Any]] = [
-        {"diagnosis": "Community-acquired pneumonia / lower respiratory tract infection", "score": 0, "reason": ""},
-        {"diagnosis": "Acute asthma/COPD exacerbation", "score": 0, "reason": ""},
-        {"diagnosis": "Sepsis with hemodynamic compromise", "score": 0, "reason": ""},
-        {"diagnosis": "Acute coronary syndrome / cardiac ischemia", "score": 0, "reason": ""},
-        {"diagnosis": "Pulmonary edema / heart failure exacerbation", "score": 0, "reason": ""},
-        {"diagnosis": "Acute gastroenteritis with dehydration", "score": 0, "reason": ""},
-        {"diagnosis": "Hypoglycemia or glucose-related metabolic emergency", "score": 0, "reason": ""},
-        {"diagnosis": "Acute neurologic emergency (stroke/seizure/CNS event)", "score": 0, "reason": ""},
-        {"diagnosis": "Malaria or other febrile parasitic illness", "score": 0, "reason": ""},
-        {"diagnosis": "Urinary sepsis / pyelonephritis", "score": 0, "reason": ""},
-    ]
-
-    def bump(name: str, points: int, reason: str) -> None:
-        for item in candidates:
-            if item["diagnosis"] == name:
-                item["score"] += points
-                if not item["reason"]:
-                    item["reason"] = reason
-                return
-
-    respiratory = any(word in text for word in ["cough", "dyspnea", "breath", "sputum", "wheeze"])
-    chest_pain = "chest pain" in text or "pressure chest" in text or "tightness" in text
-    gi = any(word in text for word in ["vomit", "diarrhea", "diarrhoea", "abdominal"])
-    neuro = any(word in text for word in ["confus", "seizure", "unconscious", "stroke", "weakness"])
-    urinary = any(word in text for word in ["dysuria", "urine", "flank"])
-    malaria_pattern = any(word in text for word in ["rigor", "chills", "malaria"])
-    edema = any(word in text for word in ["orthopnea", "pnd", "edema", "swelling legs"])
-
-    if respiratory:
-        bump("Community-acquired pneumonia / lower respiratory tract infection", 3, "Respiratory symptom cluster is present.")
-        bump("Acute asthma/COPD exacerbation", 2, "Breathlessness/wheeze pattern suggests obstructive airway disease.")
-    if fever:
-        bump("Community-acquired pneumonia / lower respiratory tract infection", 2, "Fever increases likelihood of infection.")
-        bump("Sepsis with hemodynamic compromise", 2, "Fever with systemic illness supports sepsis consideration.")
-        bump("Malaria or other febrile parasitic illness", 1, "Fever compatible with tropical febrile illness.")
-    if hypoxia:
-        bump("Community-acquired pneumonia / lower respiratory tract infection", 2, "Low oxygen saturation supports pulmonary process.")
-        bump("Pulmonary edema / heart failure exacerbation", 2, "Hypoxia may indicate cardiopulmonary fluid overload.")
-    if hypotension:
-        bump("Sepsis with hemodynamic compromise", 4, "Hypotension indicates potential circulatory failure.")
-        bump("Acute gastroenteritis with dehydration", 2, "Hypotension can result from severe volume depletion.")
-    if tachy:
-        bump("Sepsis with hemodynamic compromise", 1, "Tachycardia supports systemic stress response.")
-        bump("Acute gastroenteritis with dehydration", 1, "Tachycardia can indicate dehydration.")
-    if chest_pain:
-        bump("Acute coronary syndrome / cardiac ischemia", 4, "Chest pain/tightness requires cardiac rule-out.")
-        bump("Pulmonary edema / heart failure exacerbation", 2, "Cardiorespiratory symptoms overlap with heart failure states.")
-    if edema:
-        bump("Pulmonary edema / heart failure exacerbation", 3, "Fluid overload symptoms support heart failure.")
-    if gi:
-        bump("Acute gastroenteritis with dehydration", 4, "GI losses strongly suggest gastroenteritis/dehydration.")
-    if neuro:
-        bump("Acute neurologic emergency (stroke/seizure/CNS event)", 5, "Neurologic danger terms are present.")
-    if urinary and fever:
-        bump("Urinary sepsis / pyelonephritis", 4, "Urinary symptoms with fever suggest urinary source infection.")
-    if "glucose" in text or "sugar" in text:
-        bump("Hypoglycemia or glucose-related metabolic emergency", 3, "Glucose-related concern appears in case data.")
-    if malaria_pattern and fever:
-        bump("Malaria or other febrile parasitic illness", 4, "Fever with rigors/chills raises malaria risk where relevant.")
-
-    if assessment["risk_level"] == "High":
-        bump("Sepsis with hemodynamic compromise", 1, "High-risk physiology increases concern for systemic critical illness.")
-
-    ranked = [item for item in candidates if item["score"] > 0]
+def _score_differentials(conditions: int) -> Tuple[List[int], List[str]]:
+    scores = [0] * len(_DX_NAMES)
+    reasons = [""] * len(_DX_NAMES)
+    for mask, index, points, reason in _DX_RULES:
+        if conditions & mask == mask:
+            scores[index] += points
+            if not reasons[index]:
+                reasons[index] = reason
+    return scores, reasons
+
+
+def _rank_top_differentials(parsed: _ParsedCase, assessment: _Assessment) -> List[Dict[str, str]]:
+    temp = parsed.temp
+    pulse = parsed.pulse
+    spo2 = parsed.oxygen_sat
+    systolic = parsed.systolic
+
+    conditions = parsed.patterns
+    if temp is not None and temp >= 38.0:
+        conditions |= _FEVER
+    if systolic is not None and systolic < 90:
+        conditions |= _HYPOTENSION
+    if spo2 is not None and spo2 < 92:
+        conditions |= _HYPOXIA
+    if pulse is not None and pulse >= 110:
+        conditions |= _TACHY
+    if assessment.risk_level == "High":
+        conditions |= _HIGH_RISK
+
+    scores, reasons = _score_differentials(conditions)
+    ranked = [index for index, score in enumerate(scores) if score > 0]
     if not ranked:
-        ranked = [
-            {
-                "diagnosis": "Undifferentiated acute illness (needs serial reassessment)",
-                "score": 1,
-                "reason": "Limited discriminating features in submitted data.",
-            }
-        ]
+        return [dict(_UNDIFFERENTIATED)]
+
+    # Stable sort, so equal scores keep _DX_NAMES order. With at most ten
+    # candidates this beats heapq.nlargest(5, ...), which has more overhead.
+    ranked.sort(key=scores.__getitem__, reverse=True)
+    return [{"diagnosis": _DX_NAMES[index], "reasoning": reasons[index]} for index in ranked[:5]]
 
-    ranked.sort(key=lambda x: x["score"], reverse=True)
-    top = ranked[:5]
-    return [
-        {
-            "diagnosis": item["diagnosis"],
-            "reasoning": item["reason"] or "Supported by available symptom-vital pattern.",
-        }
-        for item in top
-    ]
+
+_MANAGE_HERE = (
+    "Reassess ABC (airway, breathing, circulation) and repeat vitals at defined intervals.",
+    "Treat the leading syndrome while monitoring for deterioration.",
+    "Document response to each intervention and update disposition if risk changes.",
+)
+_MANAGE_HERE_ESCALATED = _MANAGE_HERE + ("Use high-frequency monitoring and senior escalation thresholds.",)
+_REFERRAL_TAIL = (
+    "Communicate referral early and confirm receiving facility acceptance.",
+    "Send transfer note with vitals trend, interventions, and pending concerns.",
+    "Escort with staff capable of airway/circulatory support if unstable.",
+)
+_NO_REFERRAL = ("Referral not immediately required if patient remains stable after reassessment.",)
 
 
 def _broad_management_paths(
-    assessment: Dict[str, Any],
+    assessment: _Assessment,
     missing: List[str],
     stability: str,
     refer_immediately: str,
 ) -> Dict[str, List[str]]:
-    manage_here: List[str] = [
-        "Reassess ABC (airway, breathing, circulation) and repeat vitals at defined intervals.",
-        "Treat the leading syndrome while monitoring for deterioration.",
-        "Document response to each intervention and update disposition if risk changes.",
-    ]
-    if assessment["risk_level"] in {"Moderate", "High"}:
-        manage_here.append("Use high-frequency monitoring and senior escalation thresholds.")
-
-    before_referral: List[str] = list(assessment["stabilization_steps"])
-    before_referral.extend(
-        [
-            "Communicate referral early and confirm receiving facility acceptance.",
-            "Send transfer note with vitals trend, interventions, and pending concerns.",
-            "Escort with staff capable of airway/circulatory support if unstable.",
-        ]
-    )
-    if missing:
-        before_referral.insert(0, f"Missing local requirements: {', '.join(missing)}")
+    escalated = assessment.risk_level in {"Moderate", "High"}
+    manage_here = list(_MANAGE_HERE_ESCALATED if escalated else _MANAGE_HERE)
 
     if stability == "Yes" and refer_immediately == "No":
+        before_referral = list(_NO_REFERRAL)
+    elif missing:
         before_referral = [
-            "Referral not immediately required if patient remains stable after reassessment."
+            f"Missing local requirements: {', '.join(missing)}",
+            *assessment.stabilization_steps,
+            *_REFERRAL_TAIL,
         ]
+    else:
+        before_referral = [*assessment.stabilization_steps, *_REFERRAL_TAIL]
 
     return {
         "broad_management_if_admitted_here": manage_here,
@@ -164,24 +287,139 @@ def _broad_management_paths(
     }
 
 
-def _infer_required_resources(patient_data: Dict[str, Any]) -> Dict[str, Any]:
-    required: Set[str] = set()
-    stabilization: Set[str] = set()
-    flags: List[str] = []
-    required_diag: Set[str] = set()
-
-    systolic = _parse_bp(str(patient_data.get("blood_pressure", "")))
-    oxygen_sat = _to_float(patient_data.get("oxygen_saturation"))
-    temp = _to_float(patient_data.get("temperature"))
-    pulse = _to_float(patient_data.get("pulse"))
-    resp_rate = _to_float(patient_data.get("respiratory_rate"))
-    case_text = _case_text(patient_data)
-
-    respiratory_pattern = any(word in case_text for word in ["cough", "breath", "dyspnea", "wheeze", "chest"])
-    gi_pattern = any(word in case_text for word in ["vomit", "diarrhea", "diarrhoea", "abdominal", "dehydration"])
-    neuro_pattern = any(word in case_text for word in ["confus", "seizure", "unconscious", "stroke", "weakness"])
-    chest_pain_pattern = any(word in case_text for word in ["chest pain", "tightness", "pressure chest"])
-    malaria_pattern = any(word in case_text for word in ["chills", "rigors", "malaria"])
+# Resource names in output (alphabetical) order, keyed by their model flag bit.
+_RESOURCE_NAMES = tuple(sorted(RESOURCE_FLAGS))
+
+# Finding bits for _infer_required_resources, in rule order.
+_F_SHOCK = 1 << 0
+_F_SEVERE_HYPOXIA = 1 << 1
+_F_HYPOXIA = 1 << 2
+_F_SEPSIS = 1 << 3
+_F_SYSTEMIC_INFECTION = 1 << 4
+_F_MARKED_TACHYCARDIA = 1 << 5
+_F_TACHYCARDIA = 1 << 6
+_F_TACHYPNEA = 1 << 7
+_F_RESPIRATORY = 1 << 8
+_F_GI = 1 << 9
+_F_NEURO = 1 << 10
+_F_CHEST_PAIN = 1 << 11
+_F_MALARIA = 1 << 12
+
+# Findings that make the case high risk outright; the rest add risk points.
+_F_CRITICAL = _F_SHOCK | _F_SEVERE_HYPOXIA | _F_SEPSIS | _F_NEURO
+
+# (finding, flag, required resources incl. diagnostics, stabilization step, risk points)
+_FINDING_RULES = (
+    (
+        _F_SHOCK,
+        "Shock physiology (SBP < 90)",
+        IV_FLUIDS | START_IV | MANAGE_SHOCK | MONITOR_VITALS,
+        "Establish IV access and start fluid resuscitation",
+        0,
+    ),
+    (
+        _F_SEVERE_HYPOXIA,
+        "Severe hypoxia (SpO2 < 90)",
+        OXYGEN | MANAGE_AIRWAY | MONITOR_VITALS,
+        "Administer supplemental oxygen and monitor saturation",
+        0,
+    ),
+    (
+        _F_HYPOXIA,
+        "Possible hypoxic respiratory compromise (SpO2 < 92)",
+        OXYGEN | MONITOR_VITALS,
+        "Start oxygen if available and reassess saturation trend",
+        2,
+    ),
+    (
+        _F_SEPSIS,
+        "Possible sepsis pattern (high fever + hypotension)",
+        IV_FLUIDS | START_IV | MANAGE_SHOCK | BLOOD_GLUCOSE,
+        "Begin sepsis stabilization bundle per local protocol",
+        0,
+    ),
+    (
+        _F_SYSTEMIC_INFECTION,
+        "Possible systemic infection pattern (fever + physiologic stress)",
+        MONITOR_VITALS | BLOOD_GLUCOSE,
+        "Reassess perfusion, hydration, and progression every 15-30 minutes",
+        2,
+    ),
+    (
+        _F_MARKED_TACHYCARDIA,
+        "Marked tachycardia",
+        MONITOR_VITALS | BLOOD_GLUCOSE,
+        "Continuous monitoring and focused reassessment",
+        2,
+    ),
+    (
+        _F_TACHYCARDIA,
+        "Tachycardia",
+        MONITOR_VITALS,
+        "Repeat vitals after initial supportive care",
+        1,
+    ),
+    (
+        _F_TACHYPNEA,
+        "Tachypnea",
+        MONITOR_VITALS,
+        "Assess work of breathing and escalation threshold",
+        1,
+    ),
+    (
+        _F_RESPIRATORY,
+        "Respiratory symptom cluster",
+        MONITOR_VITALS | XRAY,
+        "Position upright and give bronchodilator if wheeze is present",
+        1,
+    ),
+    (
+        _F_GI,
+        "Gastrointestinal fluid-loss pattern",
+        IV_FLUIDS | START_IV | MONITOR_VITALS | BLOOD_GLUCOSE,
+        "Begin oral/IV rehydration based on severity",
+        1,
+    ),
+    (
+        _F_NEURO,
+        "Neurologic danger pattern",
+        MANAGE_AIRWAY | MONITOR_VITALS | BLOOD_GLUCOSE,
+        "Check glucose immediately and protect airway if sensorium is reduced",
+        0,
+    ),
+    (
+        _F_CHEST_PAIN,
+        "Chest pain/cardiac risk pattern",
+        MONITOR_VITALS | OXYGEN | ECG,
+        "Obtain ECG urgently and monitor for deterioration",
+        2,
+    ),
+    (
+        _F_MALARIA,
+        "Fever with malaria-compatible pattern",
+        MALARIA_TEST,
+        "Perform malaria testing early where endemic risk exists",
+        1,
+    ),
+)
+
+
+def _resource_names(mask: int) -> List[str]:
+    # Walking the canonical table yields names already sorted; an empty mask
+    # (the usual "nothing missing" case) skips the walk.
+    if not mask:
+        return []
+    return [name for name, bit in _RESOURCE_NAMES if mask & bit]
+
+
+def _findings(parsed: _ParsedCase) -> int:
+    """Evaluate the clinical rules for a parsed case into a bitmask of _F_* findings."""
+    systolic = parsed.systolic
+    oxygen_sat = parsed.oxygen_sat
+    temp = parsed.temp
+    pulse = parsed.pulse
+    resp_rate = parsed.resp_rate
+    patterns = parsed.patterns
 
     fever = temp is not None and temp >= 38.0
     hypotension = systolic is not None and systolic < 90
@@ -191,181 +429,109 @@ def _infer_required_resources(patient_data: Dict[str, Any]) -> Dict[str, Any]:
     tachycardia = pulse is not None and pulse >= 110
     tachypnea = resp_rate is not None and resp_rate >= 24
 
-    high_risk = False
-    risk_points = 0
+    # Each elif pair in the clinical rules becomes "second and not first".
+    return (
+        _F_SHOCK * hypotension
+        | _F_SEVERE_HYPOXIA * severe_hypoxia
+        | _F_HYPOXIA * (moderate_hypoxia and not severe_hypoxia)
+        | _F_SEPSIS * (fever and hypotension)
+        | _F_SYSTEMIC_INFECTION * (fever and not hypotension and (tachycardia or tachypnea))
+        | _F_MARKED_TACHYCARDIA * marked_tachycardia
+        | _F_TACHYCARDIA * (tachycardia and not marked_tachycardia)
+        | _F_TACHYPNEA * tachypnea
+        | _F_RESPIRATORY * bool(patterns & _RESPIRATORY)
+        | _F_GI * bool(patterns & _GI)
+        | _F_NEURO * bool(patterns & _NEURO)
+        | _F_CHEST_PAIN * bool(patterns & _CHEST_PAIN)
+        | _F_MALARIA * (fever and bool(patterns & _MALARIA))
+    )
 
-    if hypotension:
-        flags.append("Shock physiology (SBP < 90)")
-        required.update({"iv_fluids", "start_iv", "manage_shock", "monitor_vitals"})
-        stabilization.add("Establish IV access and start fluid resuscitation")
-        high_risk = True
-
-    if severe_hypoxia:
-        flags.append("Severe hypoxia (SpO2 < 90)")
-        required.update({"oxygen", "manage_airway", "monitor_vitals"})
-        stabilization.add("Administer supplemental oxygen and monitor saturation")
-        high_risk = True
-    elif moderate_hypoxia:
-        flags.append("Possible hypoxic respiratory compromise (SpO2 < 92)")
-        required.update({"oxygen", "monitor_vitals"})
-        stabilization.add("Start oxygen if available and reassess saturation trend")
-        risk_points += 2
-
-    if fever and hypotension:
-        flags.append("Possible sepsis pattern (high fever + hypotension)")
-        required.update({"iv_fluids", "start_iv", "manage_shock", "blood_glucose"})
-        required_diag.update({"blood_glucose"})
-        stabilization.add("Begin sepsis stabilization bundle per local protocol")
-        high_risk = True
-    elif fever and (tachycardia or tachypnea):
-        flags.append("Possible systemic infection pattern (fever + physiologic stress)")
-        required.update({"monitor_vitals"})
-        required_diag.update({"blood_glucose"})
-        stabilization.add("Reassess perfusion, hydration, and progression every 15-30 minutes")
-        risk_points += 2
-
-    if marked_tachycardia:
-        flags.append("Marked tachycardia")
-        required.update({"monitor_vitals", "blood_glucose"})
-        required_diag.update({"blood_glucose"})
-        stabilization.add("Continuous monitoring and focused reassessment")
-        risk_points += 2
-    elif tachycardia:
-        flags.append("Tachycardia")
-        required.update({"monitor_vitals"})
-        stabilization.add("Repeat vitals after initial supportive care")
-        risk_points += 1
-
-    if tachypnea:
-        flags.append("Tachypnea")
-        required.update({"monitor_vitals"})
-        stabilization.add("Assess work of breathing and escalation threshold")
-        risk_points += 1
-
-    if respiratory_pattern:
-        flags.append("Respiratory symptom cluster")
-        required.update({"monitor_vitals"})
-        required_diag.update({"xray"})
-        stabilization.add("Position upright and give bronchodilator if wheeze is present")
-        risk_points += 1
-
-    if gi_pattern:
-        flags.append("Gastrointestinal fluid-loss pattern")
-        required.update({"iv_fluids", "start_iv", "monitor_vitals"})
-        required_diag.update({"blood_glucose"})
-        stabilization.add("Begin oral/IV rehydration based on severity")
-        risk_points += 1
-
-    if neuro_pattern:
-        flags.append("Neurologic danger pattern")
-        required.update({"manage_airway", "monitor_vitals", "blood_glucose"})
-        required_diag.update({"blood_glucose"})
-        stabilization.add("Check glucose immediately and protect airway if sensorium is reduced")
-        high_risk = True
-
-    if chest_pain_pattern:
-        flags.append("Chest pain/cardiac risk pattern")
-        required.update({"monitor_vitals", "oxygen"})
-        required_diag.update({"ecg"})
-        stabilization.add("Obtain ECG urgently and monitor for deterioration")
-        risk_points += 2
-
-    if malaria_pattern and fever:
-        flags.append("Fever with malaria-compatible pattern")
-        required_diag.update({"malaria_test"})
-        stabilization.add("Perform malaria testing early where endemic risk exists")
-        risk_points += 1
 
-    if not flags:
-        stabilization.add("Continue routine monitoring and symptomatic care")
+def _infer_required_resources(parsed: _ParsedCase) -> _Assessment:
+    findings = _findings(parsed)
 
-    required.update(required_diag)
+    required = 0
+    # Steps are distinct per rule, so a list in rule order needs no dedup.
+    stabilization: List[str] = []
+    flags: List[str] = []
+    risk_points = 0
+    for finding, flag, resources, step, points in _FINDING_RULES:
+        if findings & finding:
+            flags.append(flag)
+            required |= resources
+            stabilization.append(step)
+            risk_points += points
+
+    if not flags:
+        stabilization.append("Continue routine monitoring and symptomatic care")
 
-    if high_risk:
+    if findings & _F_CRITICAL:
         risk = "High"
     elif risk_points >= 3:
         risk = "Moderate"
     else:
         risk = "Low"
 
-    return {
-        "risk_level": risk,
-        "flags": flags,
-        "required_resources": sorted(required),
-        "stabilization_steps": sorted(stabilization),
-        "critical_patterns": {
-            "shock_or_hypoxia": hypotension or severe_hypoxia,
-            "neurologic_danger": neuro_pattern,
-            "chest_pain_risk": chest_pain_pattern,
-        },
-    }
-
-
-def _build_available_set(centre: Centre) -> Set[str]:
-    available: Set[str] = set()
-
-    if centre.infrastructure:
-        for key in ["oxygen", "suction", "iv_fluids", "nebulizer", "power_backup"]:
-            if getattr(centre.infrastructure, key, False):
-                available.add(key)
-
-    if centre.diagnostics:
-        for key in [
-            "blood_glucose",
-            "hemoglobin",
-            "urine_test",
-            "malaria_test",
-            "ecg",
-            "xray",
-            "ultrasound",
-        ]:
-            if getattr(centre.diagnostics, key, False):
-                available.add(key)
-
-    if centre.competencies:
-        for key in ["start_iv", "give_im", "manage_airway", "intubate", "manage_shock", "monitor_vitals"]:
-            if getattr(centre.competencies, key, False):
-                available.add(key)
-
-    for med in centre.medications:
-        if med.in_stock:
-            available.add(f"med:{med.drug_name.strip().lower()}")
-
-    return available
+    return _Assessment(
+        risk_level=risk,
+        flags=flags,
+        required_resources=required,
+        stabilization_steps=stabilization,
+        findings=findings,
+    )
 
 
 def run_resource_aware_triage(patient_data: Dict[str, Any], centre: Centre) -> Dict[str, Any]:
-    assessment = _infer_required_resources(patient_data)
-    available_resources = _build_available_set(centre)
-
-    missing = [
-        resource
-        for resource in assessment["required_resources"]
-        if resource not in available_resources
-    ]
-
-    if not assessment["required_resources"]:
+    return _triage_parsed(_parse_patient(patient_data), centre)
+
+
+def run_resource_aware_triage_batch(
+    patients: Iterable[Dict[str, Any]],
+    centre: Centre,
+) -> List[Dict[str, Any]]:
+    """Triage many patients against one centre, resolving its resources once."""
+    available = centre.resource_mask
+    return [_triage_parsed(_parse_patient(patient_data), centre, available) for patient_data in patients]
+
+
+_REFER_TAIL = (
+    "Arrange early referral while continuing achievable stabilization",
+    "Send transfer note with vitals and treatments already given",
+)
+
+
+def _triage_parsed(
+    parsed: _ParsedCase,
+    centre: Centre,
+    available_resources: Optional[int] = None,
+) -> Dict[str, Any]:
+    assessment = _infer_required_resources(parsed)
+
+    required = assessment.required_resources
+    missing_mask = 0
+    # Nothing required means nothing missing, so the centre is not consulted.
+    if required:
+        if available_resources is None:
+            available_resources = centre.resource_mask
+        missing_mask = required & ~available_resources
+    missing = _resource_names(missing_mask)
+
+    # missing_mask is a subset of required.
+    if not missing_mask:
         stability = "Yes"
-    elif not missing:
-        stability = "Yes"
-    elif len(missing) < len(assessment["required_resources"]):
+    elif missing_mask != required:
         stability = "Partial"
     else:
         stability = "No"
 
-    critical = assessment["critical_patterns"]
     refer_immediately = (
         "Yes"
-        if assessment["risk_level"] == "High" and (missing or critical["chest_pain_risk"] or critical["neurologic_danger"])
+        if assessment.risk_level == "High" and (missing_mask or assessment.findings & (_F_CHEST_PAIN | _F_NEURO))
         else "No"
     )
 
-    pre_referral = assessment["stabilization_steps"]
-    if missing:
-        pre_referral = pre_referral + [
-            "Arrange early referral while continuing achievable stabilization",
-            "Send transfer note with vitals and treatments already given",
-        ]
+    steps = assessment.stabilization_steps
+    pre_referral = [*steps, *_REFER_TAIL] if missing_mask else steps
 
     treatable_here = stability == "Yes" and refer_immediately == "No"
     flag_color = "Green Flag" if treatable_here else "Red Flag"
@@ -376,12 +542,12 @@ def run_resource_aware_triage(patient_data: Dict[str, Any], centre: Centre) -> D
     )
 
     management_paths = _broad_management_paths(assessment, missing, stability, refer_immediately)
-    top_differentials = _rank_top_differentials(patient_data, assessment)
+    top_differentials = _rank_top_differentials(parsed, assessment)
 
     return {
-        "Clinical Risk Level": assessment["risk_level"],
+        "Clinical Risk Level": assessment.risk_level,
         "Stabilization Possible Here": stability,
-        "Required Resources for this Case": assessment["required_resources"],
+        "Required Resources for this Case": _resource_names(required),
         "Missing Required Resources": missing,
         "Top 5 Differentials": top_differentials,
         "Treatment Feasibility Flag": flag_color,
@@ -390,5 +556,5 @@ def run_resource_aware_triage(patient_data: Dict[str, Any], centre: Centre) -> D
         "Steps Before Referral": pre_referral,
         "Broad Management If Admitted Here": management_paths["broad_management_if_admitted_here"],
         "Broad Management Before Referral": management_paths["broad_management_before_referral"],
-        "Derived Flags": assessment["flags"],
+        "Derived Flags": assessment.flags,
     }
@@ -0,0 +1,43 @@
+import os
+import tempfile
+
+# backend.main creates its tables at import; keep that off any real database.
+os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/import.db"
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from backend.database import Base, get_db
+from backend.main import app
+from backend.migrations import upgrade_schema
+
+
+@pytest.fixture
+def db_engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'centre.db'}")
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def client(db_engine):
+    # The same startup steps backend.main runs, against the test database.
+    Base.metadata.create_all(bind=db_engine)
+    upgrade_schema(db_engine)
+    sessions = sessionmaker(autocommit=False, autoflush=False, bind=db_engine)
+
+    def test_db():
+        db = sessions()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = test_db
+    try:
+        with TestClient(app) as client:
+            yield client
+    finally:
+        app.dependency_overrides.clear()
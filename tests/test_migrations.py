@@ -0,0 +1,103 @@
+import pytest
+from sqlalchemy import create_engine, inspect, text
+
+from backend.migrations import upgrade_schema
+from backend.models import IV_FLUIDS, MONITOR_VITALS, OXYGEN, XRAY
+
+# Schema and rows as written by the version before resource flags were packed
+# and medication names made unique.
+LEGACY_SCHEMA = (
+    "CREATE TABLE centres (id INTEGER NOT NULL, name VARCHAR NOT NULL, created_at DATETIME NOT NULL, "
+    "updated_at DATETIME NOT NULL, PRIMARY KEY (id))",
+    "CREATE INDEX ix_centres_id ON centres (id)",
+    "CREATE TABLE infrastructure (centre_id INTEGER NOT NULL, oxygen BOOLEAN NOT NULL, suction BOOLEAN NOT NULL, "
+    "iv_fluids BOOLEAN NOT NULL, nebulizer BOOLEAN NOT NULL, power_backup BOOLEAN NOT NULL, PRIMARY KEY (centre_id), "
+    "FOREIGN KEY(centre_id) REFERENCES centres (id))",
+    "CREATE TABLE diagnostics (centre_id INTEGER NOT NULL, blood_glucose BOOLEAN NOT NULL, "
+    "hemoglobin BOOLEAN NOT NULL, urine_test BOOLEAN NOT NULL, malaria_test BOOLEAN NOT NULL, ecg BOOLEAN NOT NULL, "
+    "xray BOOLEAN NOT NULL, ultrasound BOOLEAN NOT NULL, PRIMARY KEY (centre_id), "
+    "FOREIGN KEY(centre_id) REFERENCES centres (id))",
+    "CREATE TABLE competencies (centre_id INTEGER NOT NULL, start_iv BOOLEAN NOT NULL, give_im BOOLEAN NOT NULL, "
+    "manage_airway BOOLEAN NOT NULL, intubate BOOLEAN NOT NULL, manage_shock BOOLEAN NOT NULL, "
+    "monitor_vitals BOOLEAN NOT NULL, PRIMARY KEY (centre_id), FOREIGN KEY(centre_id) REFERENCES centres (id))",
+    "CREATE TABLE medications (id INTEGER NOT NULL, centre_id INTEGER NOT NULL, drug_name VARCHAR NOT NULL, "
+    "in_stock BOOLEAN NOT NULL, PRIMARY KEY (id), FOREIGN KEY(centre_id) REFERENCES centres (id))",
+    "CREATE INDEX ix_medications_id ON medications (id)",
+)
+LEGACY_ROWS = (
+    "INSERT INTO centres VALUES (1, 'PHC', '2024-01-01 00:00:00', '2024-01-01 00:00:00')",
+    "INSERT INTO infrastructure VALUES (1, 1, 0, 1, 0, 0)",
+    "INSERT INTO diagnostics VALUES (1, 0, 0, 0, 0, 0, 1, 0)",
+    "INSERT INTO competencies VALUES (1, 0, 0, 0, 0, 0, 1)",
+    "INSERT INTO medications VALUES (1, 1, 'Paracetamol', 1)",
+    "INSERT INTO medications VALUES (2, 1, 'ORS', 0)",
+    "INSERT INTO medications VALUES (3, 1, 'ORS', 1)",
+    "INSERT INTO medications VALUES (4, 1, 'ors', 0)",
+    "INSERT INTO medications VALUES (5, 1, 'amoxicillin', 0)",
+)
+
+
+@pytest.fixture
+def db_engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    with engine.begin() as conn:
+        for statement in LEGACY_SCHEMA + LEGACY_ROWS:
+            conn.execute(text(statement))
+    yield engine
+    engine.dispose()
+
+
+def _medications(engine):
+    with engine.connect() as conn:
+        return conn.execute(text("SELECT id, drug_name, in_stock FROM medications ORDER BY id")).all()
+
+
+def _snapshot(engine):
+    with engine.connect() as conn:
+        schema = conn.execute(text("SELECT type, name, sql FROM sqlite_master ORDER BY name")).all()
+        tables = [name for kind, name, _ in schema if kind == "table"]
+        rows = {table: conn.execute(text(f"SELECT * FROM {table}")).all() for table in tables}
+    return schema, rows
+
+
+def test_upgrade_packs_flags_and_merges_medications(db_engine):
+    upgrade_schema(db_engine)
+
+    with db_engine.connect() as conn:
+        flags = [
+            conn.execute(text(f"SELECT centre_id, flags FROM {table}")).all()
+            for table in ("infrastructure", "diagnostics", "competencies")
+        ]
+    assert flags == [[(1, OXYGEN | IV_FLUIDS)], [(1, XRAY)], [(1, MONITOR_VITALS)]]
+    assert [column["name"] for column in inspect(db_engine).get_columns("infrastructure")] == ["centre_id", "flags"]
+    assert _medications(db_engine) == [(1, "Paracetamol", 1), (2, "ORS", 1), (5, "amoxicillin", 0)]
+
+
+def test_second_upgrade_is_a_noop(db_engine):
+    upgrade_schema(db_engine)
+    upgraded = _snapshot(db_engine)
+
+    upgrade_schema(db_engine)
+    assert _snapshot(db_engine) == upgraded
+
+
+def test_setup_creates_a_centre_in_an_emptied_legacy_database(client, db_engine):
+    # The legacy timestamp columns have no database default.
+    with db_engine.begin() as conn:
+        for table in ("medications", "infrastructure", "diagnostics", "competencies", "centres"):
+            conn.execute(text(f"DELETE FROM {table}"))
+
+    response = client.post("/peripheral/setup", data={"centre_name": "New PHC", "oxygen": "on"}, follow_redirects=False)
+
+    assert response.status_code == 303
+    with db_engine.connect() as conn:
+        assert conn.execute(text("SELECT name FROM centres")).scalars().all() == ["New PHC"]
+        assert conn.execute(text("SELECT flags FROM infrastructure")).scalars().all() == [OXYGEN]
+
+
+def test_setup_save_recases_a_merged_medication(client, db_engine):
+    form = {"centre_name": "PHC", "medication_names": ["Paracetamol", "ors"], "medication_stock": ["ors"]}
+    response = client.post("/peripheral/setup", data=form, follow_redirects=False)
+
+    assert response.status_code == 303
+    assert _medications(db_engine) == [(1, "Paracetamol", 0), (2, "ors", 1)]
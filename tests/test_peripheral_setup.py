@@ -0,0 +1,55 @@
+from sqlalchemy import text
+
+from backend.models import IV_FLUIDS, MANAGE_SHOCK, MONITOR_VITALS, OXYGEN, ULTRASOUND, XRAY
+
+
+def _profile(engine):
+    with engine.connect() as conn:
+        names = conn.execute(text("SELECT name FROM centres")).scalars().all()
+        flags = [
+            conn.execute(text(f"SELECT flags FROM {table}")).scalar_one()
+            for table in ("infrastructure", "diagnostics", "competencies")
+        ]
+        medications = conn.execute(text("SELECT id, drug_name, in_stock FROM medications ORDER BY id")).all()
+    return names, flags, medications
+
+
+def test_setup_saves_and_then_syncs_the_profile(client, db_engine):
+    first = {
+        "centre_name": "PHC",
+        "oxygen": "on",
+        "xray": "on",
+        "monitor_vitals": "on",
+        "medication_names": ["Paracetamol", "ORS", " ", "amoxicillin"],
+        "medication_stock": ["paracetamol", "ors"],
+    }
+    assert client.post("/peripheral/setup", data=first, follow_redirects=False).status_code == 303
+    assert _profile(db_engine) == (
+        ["PHC"],
+        [OXYGEN, XRAY, MONITOR_VITALS],
+        [(1, "Paracetamol", 1), (2, "ORS", 1), (3, "amoxicillin", 0)],
+    )
+
+    # Drop ORS, re-case and stock amoxicillin, unstock Paracetamol, add Ceftriaxone.
+    second = {
+        "centre_name": "PHC Annex",
+        "iv_fluids": "on",
+        "ultrasound": "on",
+        "manage_shock": "true",
+        "medication_names": ["Paracetamol", "Amoxicillin", "Ceftriaxone"],
+        "medication_stock": ["amoxicillin"],
+    }
+    assert client.post("/peripheral/setup", data=second, follow_redirects=False).status_code == 303
+    assert _profile(db_engine) == (
+        ["PHC Annex"],
+        [IV_FLUIDS, ULTRASOUND, MANAGE_SHOCK],
+        [(1, "Paracetamol", 0), (3, "Amoxicillin", 1), (4, "Ceftriaxone", 0)],
+    )
+
+
+def test_update_page_lists_medications_in_entry_order(client):
+    form = {"centre_name": "PHC", "medication_names": ["Paracetamol", "ORS", "amoxicillin"]}
+    client.post("/peripheral/setup", data=form, follow_redirects=False)
+
+    page = client.get("/peripheral/update").text
+    assert page.index("Paracetamol") < page.index("ORS") < page.index("amoxicillin")
@@ -0,0 +1,90 @@
+import json
+from pathlib import Path
+
+import pytest
+
+from backend.reasoning_engine import _normalize_text, _parse_bp, _to_float, generate_clinical_analysis
+
+GOLDEN = json.loads((Path(__file__).parent / "golden" / "engine_outputs.json").read_text())
+
+
+@pytest.mark.parametrize("mode", sorted(GOLDEN["analysis"]))
+@pytest.mark.parametrize("index", range(len(GOLDEN["cases"])))
+def test_analysis_matches_golden(mode, index):
+    result = generate_clinical_analysis(dict(GOLDEN["cases"][index]), mode)
+    assert json.loads(json.dumps(result)) == GOLDEN["analysis"][mode][index]
+
+
+# PatientInput.comorbidities is Optional[str]; student mode echoes the raw
+# value into the problem representation, the other modes only search it.
+@pytest.mark.parametrize("mode", ["clinician", "peripheral"])
+def test_none_comorbidities_reads_as_empty(mode):
+    case = dict(GOLDEN["cases"][1], comorbidities=None)
+    assert generate_clinical_analysis(case, mode) == GOLDEN["analysis"][mode][1]
+
+
+def test_none_comorbidities_in_student_mode():
+    case = dict(GOLDEN["cases"][1], comorbidities=None)
+    assert generate_clinical_analysis(case, "student")["Problem Representation"].endswith("comorbidities: None")
+
+
+def test_normalize_text_formats_non_string_values():
+    case = {"chief_complaint": "Cough", "symptoms": None, "lab_values": 5, "comorbidities": 0}
+    assert _normalize_text(case) == "cough  5 0"
+
+
+def test_numeric_lab_values_are_analysed():
+    case = dict(GOLDEN["cases"][0], lab_values=5)
+    assert generate_clinical_analysis(case, "clinician") == GOLDEN["analysis"]["clinician"][0]
+
+
+def test_unhashable_input_is_analysed_uncached():
+    case = dict(GOLDEN["cases"][0], attachments=["xray.png"])
+    assert generate_clinical_analysis(case, "clinician") == GOLDEN["analysis"]["clinician"][0]
+
+
+@pytest.mark.parametrize(
+    "value, expected",
+    [
+        (None, (None, None)),
+        ("", (None, None)),
+        ("120/80", (120, 80)),
+        ("120 / 80 mmHg", (120, 80)),
+        ("84/50", (84, 50)),
+        ("1200/80", (200, 80)),
+        ("9/60", (None, None)),
+        ("120/8", (None, None)),
+        ("120/800", (120, 800)),
+        ("garbage", (None, None)),
+        ("bp 130/85", (130, 85)),
+        (12080, (None, None)),
+        ("١٢٠/٨٠", (120, 80)),
+        ("abc 99/70 xyz", (99, 70)),
+        ("¹²⁰/⁸⁰", (None, None)),
+    ],
+)
+def test_parse_bp(value, expected):
+    assert _parse_bp(value) == expected
+
+
+@pytest.mark.parametrize(
+    "value, expected",
+    [
+        (None, None),
+        (0, 0.0),
+        (37, 37.0),
+        (True, None),
+        (1e20, 1.0),
+        ("39.2", 39.2),
+        ("88%", 88.0),
+        ("abc", None),
+        ("", None),
+        ("-2", -2.0),
+        ("1e3", 1.0),
+        ("nan", None),
+        ("12.5.3", 12.5),
+        (".5", 5.0),
+    ],
+)
+def test_to_float(value, expected):
+    assert _to_float(value) == expected
@@ -0,0 +1,103 @@
+import json
+from pathlib import Path
+from typing import Iterable
+
+import pytest
+
+from backend.models import Centre, Competencies, Diagnostics, Infrastructure
+from backend.triage_engine import _parse_bp, _to_float, run_resource_aware_triage, run_resource_aware_triage_batch
+
+GOLDEN = json.loads((Path(__file__).parent / "golden" / "engine_outputs.json").read_text())
+
+
+def _centre(resources: Iterable[str]) -> Centre:
+    parts = (Infrastructure(flags=0), Diagnostics(flags=0), Competencies(flags=0))
+    for name in resources:
+        setattr(next(part for part in parts if hasattr(type(part), name)), name, True)
+    infrastructure, diagnostics, competencies = parts
+    return Centre(name="PHC", infrastructure=infrastructure, diagnostics=diagnostics, competencies=competencies)
+
+
+def _plain(result):
+    return json.loads(json.dumps(result))
+
+
+@pytest.mark.parametrize("profile", sorted(GOLDEN["profiles"]))
+@pytest.mark.parametrize("index", range(len(GOLDEN["cases"])))
+def test_triage_matches_golden(profile, index):
+    centre = _centre(GOLDEN["profiles"][profile])
+    result = run_resource_aware_triage(dict(GOLDEN["cases"][index]), centre)
+    assert _plain(result) == GOLDEN["triage"][profile][index]
+
+
+@pytest.mark.parametrize("profile", sorted(GOLDEN["profiles"]))
+def test_batch_matches_single_calls(profile):
+    centre = _centre(GOLDEN["profiles"][profile])
+    results = run_resource_aware_triage_batch([dict(case) for case in GOLDEN["cases"]], centre)
+    assert _plain(results) == GOLDEN["triage"][profile]
+
+
+def test_triage_sees_profile_changes_between_calls():
+    case = dict(GOLDEN["cases"][0])
+    centre = _centre(GOLDEN["profiles"]["full"])
+    assert run_resource_aware_triage(case, centre)["Missing Required Resources"] == []
+
+    centre.infrastructure.flags = 0
+    centre.diagnostics.flags = 0
+    centre.competencies.flags = 0
+    missing = run_resource_aware_triage(case, centre)["Missing Required Resources"]
+    assert missing == run_resource_aware_triage(case, _centre([]))["Missing Required Resources"]
+    assert missing
+
+
+@pytest.mark.parametrize(
+    "value, expected",
+    [
+        (None, None),
+        ("", None),
+        ("120/80", 120),
+        ("120 / 80 mmHg", 120),
+        (" 90/60", 90),
+        ("150/95 mmHg", 150),
+        ("1200/80", None),
+        ("9/60", None),
+        ("120/8", None),
+        ("120/800", 120),
+        ("garbage", None),
+        ("bp 130/85", None),
+        ("130/85/70", 130),
+        (12080, None),
+        ("١٢٠/٨٠", 120),
+        ("120/80abc", 120),
+    ],
+)
+def test_parse_bp(value, expected):
+    assert _parse_bp(value) == expected
+
+
+@pytest.mark.parametrize(
+    "value, expected",
+    [
+        (None, None),
+        (0, 0.0),
+        (38.5, 38.5),
+        (True, None),
+        (1e20, 1.0),
+        ("39.2", 39.2),
+        ("88%", 88.0),
+        (" 124 ", 124.0),
+        ("abc", None),
+        ("", None),
+        ("t=38.4C", 38.4),
+        ("-2", -2.0),
+        ("1e3", 1.0),
+        ("nan", None),
+        ("inf", None),
+        ("12.5.3", 12.5),
+        (".5", 5.0),
+        ("5.", 5.0),
+        ("1_000", 1.0),
+    ],
+)
+def test_to_float(value, expected):
+    assert _to_float(value) == expected